@@ -1,21 +1,80 @@
 # Create a reusable script that prints colorized conversations from your results file.
-from textwrap import fill, indent
+from textwrap import indent
+import functools
+import itertools
 import json
 import argparse
+import mmap
 import os
+import re
 import sys
+from enum import IntEnum
 
-ANSI = {
-    "reset": "\033[0m",
-    "dim": "\033[2m",
-    "bold": "\033[1m",
-    "user": "\033[92m",       # green
-    "assistant": "\033[96m",  # cyan
-    "tool": "\033[95m",       # magenta
-    "meta": "\033[90m",       # gray
-    "error": "\033[91m",      # red
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# orjson reads integers outside the 64-bit range as floats, which can happen
+# from 19 digits on (below -2**63); leave those inputs to the stdlib. Digit runs
+# that are part of a float (fraction or exponent follows/precedes) don't count.
+_LONG_DIGITS = re.compile(r"(?<![\d.])\d{19,}(?![\d.eE])")
+_LONG_DIGITS_BYTES = re.compile(rb"(?<![\d.])\d{19,}(?![\d.eE])")
+
+def _json_loads(s):
+    # Prefer orjson, but decode like the stdlib: inputs it rejects (NaN, Infinity)
+    # or would lose integer precision on go through json.loads
+    if orjson is not None:
+        long_digits = _LONG_DIGITS if isinstance(s, str) else _LONG_DIGITS_BYTES
+        if long_digits.search(s) is None:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+    if isinstance(s, memoryview):
+        s = s.tobytes()
+    return json.loads(s)
+
+class Color(IntEnum):
+    RESET = 0
+    DIM = 1
+    BOLD = 2
+    USER = 3
+    ASSISTANT = 4
+    TOOL = 5
+    META = 6
+    ERROR = 7
+
+# ANSI escape per Color, indexed by its value
+ANSI = (
+    "\033[0m",   # reset
+    "\033[2m",   # dim
+    "\033[1m",   # bold
+    "\033[92m",  # user: green
+    "\033[96m",  # assistant: cyan
+    "\033[95m",  # tool: magenta
+    "\033[90m",  # meta: gray
+    "\033[91m",  # error: red
+)
+
+# role -> (tag, color); tool turns are tagged from their originating call
+ROLE_STYLE = {
+    "assistant": ("[assistant]", Color.ASSISTANT),
+    "user": ("[user]", Color.USER),
+    "system": ("[system]", Color.META),
 }
 
+# Lines starting with these (ignoring surrounding whitespace) are kept as-is by _wrap
+VERBATIM_PREFIXES = ("```", "> ", "- ", "* ")
+
+# Read buffer for results files; these are often tens of MB
+READ_BUFFER_SIZE = 64 * 1024
+
 def _supports_color(force_color: bool) -> bool:
     if force_color:
         return True
@@ -26,8 +85,47 @@ def _supports_color(force_color: bool) -> bool:
         return True
     return True
 
-def _color(text: str, code: str, enable: bool) -> str:
-    return f"{ANSI[code]}{text}{ANSI['reset']}" if enable else text
+def _colorizer(enable: bool):
+    """Return a `(text, color) -> str` colorizing function, resolving `enable` once."""
+    if not enable:
+        return lambda text, code: text
+
+    reset = ANSI[Color.RESET]
+
+    def _color(text: str, code: Color) -> str:
+        return ANSI[code] + text + reset
+
+    return _color
+
+def _fast_wrap(line: str, width: int) -> str:
+    """
+    Greedy word wrap of a single line, in linear time. Breaks at the last space
+    that fits; a word longer than `width` fills the rest of the current line and
+    is hard-broken, like textwrap.fill does for plain text (which additionally
+    splits words at hyphens).
+    """
+    line = line.rstrip()
+    out = []
+    i, n = 0, len(line)
+    while n - i > width:
+        e = i + width  # first position that does not fit
+        if line[e] == " ":
+            k = e
+        else:
+            # Start and end of the word that crosses the width
+            k = max(line.rfind(" ", i, e) + 1, i)
+            word_end = line.find(" ", e)
+            if (n if word_end == -1 else word_end) - k > width:
+                # Too long for any line: fill this one up with its head
+                k = e
+        head = line[i:k].rstrip()
+        if head:
+            out.append(head)
+        i = k
+        while i < n and line[i] == " ":
+            i += 1
+    out.append(line[i:])
+    return "\n".join(out)
 
 def _wrap(text: str, width: int) -> str:
     if width <= 0:
@@ -35,28 +133,42 @@ def _wrap(text: str, width: int) -> str:
     # Preserve code blocks and lists minimally by line
     lines = []
     for line in text.splitlines():
-        if line.strip().startswith(("```", "> ", "- ", "* ")):
+        if line.strip().startswith(VERBATIM_PREFIXES):
             lines.append(line)
         else:
-            lines.append(fill(line, width=width))
+            # Expand tabs first, as fill() does, so widths are counted in columns
+            line = line.expandtabs()
+            lines.append(line.rstrip() if len(line) <= width else _fast_wrap(line, width))
     return "\n".join(lines)
 
+@functools.lru_cache(maxsize=4096)
 def _compact_args(arg_str: str, max_len: int = 200) -> str:
     """
     Turn a function.arguments JSON string into a compact key=value, comma-separated
-    representation, truncating long values.
+    representation, truncating long values. Memoized: the same arguments recur
+    across assistant calls and their tool results.
     """
     if not arg_str:
         return ""
     try:
-        args = json.loads(arg_str)
+        args = _json_loads(arg_str)
     except Exception:
         s = arg_str.replace("\n", " ")
         return s if len(s) <= max_len else s[: max_len - 1] + "…"
 
     parts = []
     def trunc(v):
-        s = json.dumps(v, ensure_ascii=False)
+        # Primitives whose JSON form is known don't need a full encode
+        if isinstance(v, str) and v.isprintable() and '"' not in v and "\\" not in v:
+            s = f'"{v}"'
+        elif isinstance(v, bool):
+            s = "true" if v else "false"
+        elif isinstance(v, int):
+            s = str(v)
+        elif v is None:
+            s = "null"
+        else:
+            s = json.dumps(v, ensure_ascii=False)
         return s if len(s) <= 80 else s[:79] + "…"
 
     if isinstance(args, dict):
@@ -69,108 +181,96 @@ def _compact_args(arg_str: str, max_len: int = 200) -> str:
     return out if len(out) <= max_len else out[: max_len - 1] + "…"
 
 
-def print_conversation(
-    file_path: str,
-    task_id: int,
-    trial: int,
-    width: int = 100,
-    color: bool = True,
-):
-    if not os.path.exists(file_path):
-        print(_color(f"[error] File not found: {file_path}", "error", color))
-        return
+def _tool_call_parts(tc):
+    """Return (call_id, function name or None, compact args) for an assistant tool call."""
+    tc = tc or {}
+    func = tc.get("function") or {}
+    return tc.get("id") or tc.get("tool_call_id"), func.get("name"), _compact_args(func.get("arguments", ""))
+
 
+def _load_json_file(f):
+    """
+    Decode a whole JSON file. With orjson, a regular file is parsed straight from
+    a read-only mmap of it; pipes, empty files and the like are read instead.
+    """
+    if orjson is None:
+        return json.loads(f.read())
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print(_color(f"[error] Failed to parse JSON: {e}", "error", color))
-        return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return _json_loads(f.read())
+    with mm, memoryview(mm) as view:
+        return _json_loads(view)
 
-    # Find the entry with matching task_id and trial
-    match = None
-    if isinstance(data, list):
-        for entry in data:
-            if isinstance(entry, dict) and entry.get("task_id") == task_id and entry.get("trial") == trial:
-                match = entry
-                break
-    else:
-        print(_color("[error] Expected a list at JSON top level.", "error", color))
-        return
 
-    if match is None:
-        print(_color(f"[error] No record found for task_id={task_id}, trial={trial}.", "error", color))
-        return
+class NotAListError(Exception):
+    """The results file parsed, but its top level is not a list."""
 
-    traj = match.get("traj", [])
-    if not traj:
-        print(_color("[error] No 'traj' found in the selected record.", "error", color))
-        return
 
-    # Pretty header
-    header = f"Conversation — task_id={task_id}, trial={trial}"
-    print(_color(header, "bold", color))
-    print(_color("─" * len(header), "meta", color))
+def _first_match(entries, task_id: int, trial: int):
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get("task_id") == task_id and entry.get("trial") == trial:
+            return entry
+    return None
 
-    # Instruction (if present)
-    instr = None
-    try:
-        instr = match["info"]["task"]["instruction"]
-    except Exception:
-        instr = None
-    if instr:
-        print(_color("[instruction]", "bold", color))
-        print(indent(_wrap(instr, width), "  "))
-        print(_color("─" * len(header), "meta", color))
 
-    # Build tool_call_id -> (func_name, compact_args)
-    id2call = {}
+def _find_record(f, task_id: int, trial: int):
+    """
+    Return the first entry of the results list in the binary file `f` matching
+    (task_id, trial), or None. With ijson installed the file is streamed and the
+    scan stops at the match instead of decoding the whole list.
+    Raises NotAListError if the JSON top level is not a list.
+    """
+    if ijson is not None:
+        try:
+            events = ijson.parse(f, use_float=True)
+            first = next(events)
+            if first[1] != "start_array":
+                raise NotAListError("Expected a list at JSON top level.")
+            return _first_match(ijson.items(itertools.chain([first], events), "item"), task_id, trial)
+        except ijson.JSONError:
+            # ijson rejects some input json.loads accepts (NaN, Infinity);
+            # decode the whole file instead when we can start over
+            if not f.seekable():
+                raise
+            f.seek(0)
+    entries = _load_json_file(f)
+    if not isinstance(entries, list):
+        raise NotAListError("Expected a list at JSON top level.")
+    return _first_match(entries, task_id, trial)
+
+
+def _render_turns(traj, width: int, _color, started: bool):
+    """
+    Render trajectory turns into output lines. Unless `started`, turns before
+    the first user turn are skipped. Tool calls are recorded as assistant turns
+    go by; their results always come after them.
+    Returns (lines, started).
+    """
+    lines = []
+    id2call = {}  # tool_call_id -> (func_name, compact_args)
     for turn in traj:
-        if turn.get("role") == "assistant":
-            for tc in (turn.get("tool_calls") or []):
-                func = (tc or {}).get("function") or {}
-                fname = func.get("name", "")
-                fargs = func.get("arguments", "")
-                comp = _compact_args(fargs)
-                call_id = tc.get("id") or tc.get("tool_call_id")
-                if call_id:
-                    id2call[call_id] = (fname, comp)
-
-    # Start from first user turn
-    start_idx = 0
-    for i, turn in enumerate(traj):
-        if isinstance(turn, dict) and turn.get("role") == "user":
-            start_idx = i
-            break
-
-    # Iterate and print
-    for turn in traj[start_idx:]:
         role = turn.get("role", "assistant")
         raw_content = turn.get("content")
         tool_name = turn.get("name")                # for role == "tool"
         tool_call_id = turn.get("tool_call_id")     # for role == "tool"
 
         if role == "assistant":
-            role_tag = _color("[assistant]", "assistant", color)
+            calls = [_tool_call_parts(tc) for tc in (turn.get("tool_calls") or [])]
+            id2call.update((call_id, (fname or "", comp)) for call_id, fname, comp in calls if call_id)
+            if not started:
+                continue
+            role_tag = _color(*ROLE_STYLE["assistant"])
             if raw_content is None:
                 # Assistant made tool call(s) only — print compact summary with args
-                tool_calls = turn.get("tool_calls") or []
-                if tool_calls:
-                    parts = []
-                    for tc in tool_calls:
-                        func = (tc or {}).get("function") or {}
-                        fname = func.get("name", "<?>")
-                        comp = _compact_args(func.get("arguments", ""))
-                        parts.append(f"{fname}({comp})" if comp else f"{fname}()")
-                    msg = "→ tool call(s): " + "; ".join(parts)
-                else:
-                    msg = ""
+                msg = "→ tool call(s): " + "; ".join(
+                    f"{'<?>' if fname is None else fname}({comp})" for _, fname, comp in calls
+                ) if calls else ""
             else:
                 msg = raw_content
 
-        elif role == "user":
-            role_tag = _color("[user]", "user", color)
-            msg = raw_content or ""
+        elif not started and role != "user":
+            continue
 
         elif role == "tool":
             # Show tool name with compact args from the originating assistant call
@@ -179,28 +279,88 @@ def print_conversation(
                 fname, comp = id2call[tool_call_id]
             display = tool_name or fname or ""
             if display and comp:
-                role_tag = _color(f"[tool:{display}({comp})]", "tool", color)
+                role_tag = _color(f"[tool:{display}({comp})]", Color.TOOL)
             elif display:
-                role_tag = _color(f"[tool:{display}]", "tool", color)
+                role_tag = _color(f"[tool:{display}]", Color.TOOL)
             else:
-                role_tag = _color("[tool]", "tool", color)
-            msg = raw_content or ""
-
-        elif role == "system":
-            role_tag = _color("[system]", "meta", color)
+                role_tag = _color("[tool]", Color.TOOL)
             msg = raw_content or ""
 
         else:
-            role_tag = _color(f"[{role}]", "meta", color)
+            # Only a user turn gets here before the conversation has started
+            started = True
+            tag, tag_color = ROLE_STYLE.get(role) or (f"[{role}]", Color.META)
+            role_tag = _color(tag, tag_color)
             msg = raw_content or ""
 
         # Wrap and indent content
         msg_wrapped = _wrap(msg, width)
-        print(f"{role_tag} ")
+        lines.append(f"{role_tag} ")
         if msg_wrapped.strip():
-            print(indent(msg_wrapped, "  "))
+            lines.append(indent(msg_wrapped, "  "))
         else:
-            print(indent(_color("(no content)", "dim", color), "  "))
+            lines.append(indent(_color("(no content)", Color.DIM), "  "))
+
+    return lines, started
+
+
+def print_conversation(
+    file_path: str,
+    task_id: int,
+    trial: int,
+    width: int = 100,
+    color: bool = True,
+):
+    _color = _colorizer(color)
+
+    if not os.path.exists(file_path):
+        print(_color(f"[error] File not found: {file_path}", Color.ERROR))
+        return
+
+    # Find the entry with matching task_id and trial
+    try:
+        with open(file_path, "rb", buffering=READ_BUFFER_SIZE) as f:
+            match = _find_record(f, task_id, trial)
+    except NotAListError as e:
+        print(_color(f"[error] {e}", Color.ERROR))
+        return
+    except Exception as e:
+        print(_color(f"[error] Failed to parse JSON: {e}", Color.ERROR))
+        return
+
+    if match is None:
+        print(_color(f"[error] No record found for task_id={task_id}, trial={trial}.", Color.ERROR))
+        return
+
+    traj = match.get("traj", [])
+    if not traj:
+        print(_color("[error] No 'traj' found in the selected record.", Color.ERROR))
+        return
+
+    # Collect all output and write it once at the end
+    out = []
+
+    # Pretty header
+    header = f"Conversation — task_id={task_id}, trial={trial}"
+    out.append(_color(header, Color.BOLD))
+    out.append(_color("─" * len(header), Color.META))
+
+    # Instruction (if present)
+    info = match.get("info")
+    task = info.get("task") if isinstance(info, dict) else None
+    instr = task.get("instruction") if isinstance(task, dict) else None
+    if instr:
+        out.append(_color("[instruction]", Color.BOLD))
+        out.append(indent(_wrap(instr, width), "  "))
+        out.append(_color("─" * len(header), Color.META))
+
+    # Start from the first user turn; without one, show the whole trajectory
+    lines, started = _render_turns(traj, width, _color, started=False)
+    if not started:
+        lines, _ = _render_turns(traj, width, _color, started=True)
+    out.extend(lines)
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def _build_argparser():
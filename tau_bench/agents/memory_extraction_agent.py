@@ -1,14 +1,27 @@
-from typing import Dict, Any, List
+import asyncio
+import copy
+import functools
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 import json 
-from litellm import completion
+from litellm import Router
 from tau_bench.envs.airline.tools.tool_templates import TOOL_TEMPLATES
 from tau_bench.utils import format_diaglogue, clean_json_content
 
+@functools.lru_cache(maxsize=None)
+def _default_tool_descriptions() -> str:
+    # the default templates never change, so serialize them at most once
+    return json.dumps(TOOL_TEMPLATES, indent=2)
+
+# number of parsed extractions kept per agent, keyed by a digest of the prompt
+MEMORY_CACHE_SIZE = 256
+
 class ExtractionAgent:
     def __init__(
         self, 
-        tool_templates: Dict[str, str] = TOOL_TEMPLATES,
         model: str,
+        tool_templates: Dict[str, str] = TOOL_TEMPLATES,
         provider: str = "openai",
         temperature: float = 0.0,
         wiki: str = "",
@@ -20,9 +33,23 @@ class ExtractionAgent:
         self.temperature = temperature
         self.wiki = wiki
         self.wiki_aware = wiki_aware
+        self._memory_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        # a single-deployment router keeps its provider client (and connection
+        # pool) alive across extract_memory calls
+        self._router = Router(
+            model_list=[
+                {
+                    "model_name": model,
+                    "litellm_params": {"model": model, "custom_llm_provider": provider},
+                }
+            ]
+        )
 
     def _build_prompt(self) -> str:
-        tool_descriptions = json.dumps(self.tool_templates, indent=2)
+        if self.tool_templates is TOOL_TEMPLATES:
+            tool_descriptions = _default_tool_descriptions()
+        else:
+            tool_descriptions = json.dumps(self.tool_templates, indent=2)
 
         # add wiki info if wiki_aware is True
         wiki_section = ""
@@ -40,17 +67,64 @@ class ExtractionAgent:
     TBC"""
 
 
-    def extract_memory(self, dialogue: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _extraction_prompt(self, dialogue: List[Dict[str, Any]]) -> str:
         formatted_dialogue = format_diaglogue(dialogue)
-        prompt = TOOL_TEMPLATES["memory_extraction"].format(dialogue=formatted_dialogue)
+        return TOOL_TEMPLATES["memory_extraction"].format(dialogue=formatted_dialogue)
+
+    def _parse_memory(self, response: Any) -> Dict[str, Any]:
+        content = clean_json_content(response.choices[0].text)
+        return json.loads(content)
+
+    def _cached_memory(self, key: bytes) -> Optional[Dict[str, Any]]:
+        memory_data = self._memory_cache.get(key)
+        if memory_data is None:
+            return None
+        self._memory_cache.move_to_end(key)
+        return copy.deepcopy(memory_data)
+
+    def _cache_memory(self, key: bytes, memory_data: Dict[str, Any]) -> None:
+        self._memory_cache[key] = copy.deepcopy(memory_data)
+        if len(self._memory_cache) > MEMORY_CACHE_SIZE:
+            self._memory_cache.popitem(last=False)
 
-        response = completion(
-            model=self.model_name,
+    def extract_memory(self, dialogue: List[Dict[str, Any]]) -> Dict[str, Any]:
+        prompt = self._extraction_prompt(dialogue)
+        key = _prompt_key(prompt)
+        memory_data = self._cached_memory(key)
+        if memory_data is not None:
+            return memory_data
+        response = self._router.text_completion(
+            model=self.model,
             prompt=prompt,
             max_tokens=500,
             temperature=0.0,
         )
+        memory_data = self._parse_memory(response)
+        self._cache_memory(key, memory_data)
+        return memory_data
 
-        content = clean_json_content(response.choices[0].text)
-        memory_data = json.loads(content)
-        return memory_data
\ No newline at end of file
+    async def aextract_memory(self, dialogue: List[Dict[str, Any]]) -> Dict[str, Any]:
+        prompt = self._extraction_prompt(dialogue)
+        key = _prompt_key(prompt)
+        memory_data = self._cached_memory(key)
+        if memory_data is not None:
+            return memory_data
+        response = await self._router.atext_completion(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=500,
+            temperature=0.0,
+        )
+        memory_data = self._parse_memory(response)
+        self._cache_memory(key, memory_data)
+        return memory_data
+
+    async def aextract_memories(
+        self, dialogues: List[List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Extract memory from several dialogues concurrently, in input order."""
+        return await asyncio.gather(*[self.aextract_memory(d) for d in dialogues])
+
+
+def _prompt_key(prompt: str) -> bytes:
+    return hashlib.blake2b(prompt.encode(), digest_size=16).digest()